@@ -1,128 +1,204 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta
+from datetime import timedelta
+from typing import Optional
+
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import and_, case, func
 from sqlmodel import select
 
 from .db import session_scope
-from .models import Device, Check, Result, AlertEvent, Incident
+from .models import Device, Check, Result, AlertEvent, Incident, CheckStatus, UptimeBucket
+from .netdash.timeutil import utcnow
 
 router = APIRouter(prefix="/api")
 
+# List endpoints project only what the dashboard reads; the JSON blobs
+# (Result.details, AlertEvent.meta, Incident.meta) stay in the DB. They build
+# plain dicts and return ORJSONResponse directly, which skips FastAPI's
+# jsonable_encoder pass over every row.
+_RESULT_COLS = (Result.id, Result.check_id, Result.ts, Result.status, Result.latency_ms, Result.samples)
+_ALERT_COLS = (
+    AlertEvent.id, AlertEvent.ts, AlertEvent.device_id, AlertEvent.check_id,
+    AlertEvent.severity, AlertEvent.message,
+)
+_INCIDENT_COLS = (
+    Incident.id, Incident.device_id, Incident.check_id, Incident.state,
+    Incident.opened_ts, Incident.closed_ts, Incident.open_reason, Incident.close_reason,
+)
+
 
 @router.get("/devices")
-def list_devices():
-    with session_scope() as s:
-        return s.exec(select(Device)).all()
+async def list_devices():
+    async with session_scope() as s:
+        return (await s.exec(select(Device))).all()
 
 
 @router.post("/devices")
-def create_device(device: Device):
-    with session_scope() as s:
+async def create_device(device: Device):
+    async with session_scope() as s:
         s.add(device)
-        s.commit()
-        s.refresh(device)
+        await s.commit()
+        await s.refresh(device)
         return device
 
 
 @router.get("/devices/{device_id}/checks")
-def list_checks(device_id: int):
-    with session_scope() as s:
-        dev = s.get(Device, device_id)
+async def list_checks(device_id: int):
+    async with session_scope() as s:
+        dev = await s.get(Device, device_id)
         if not dev:
             raise HTTPException(404, "device not found")
-        return s.exec(select(Check).where(Check.device_id == device_id)).all()
+        return (await s.exec(select(Check).where(Check.device_id == device_id))).all()
 
 
 @router.post("/checks")
-def create_check(check: Check):
-    with session_scope() as s:
-        dev = s.get(Device, check.device_id)
+async def create_check(check: Check):
+    async with session_scope() as s:
+        dev = await s.get(Device, check.device_id)
         if not dev:
             raise HTTPException(404, "device not found")
         s.add(check)
-        s.commit()
-        s.refresh(check)
+        await s.commit()
+        await s.refresh(check)
         return check
 
 
 @router.get("/results/recent")
-def recent_results(minutes: int = 60):
-    since = datetime.utcnow() - timedelta(minutes=max(1, minutes))
-    with session_scope() as s:
-        return s.exec(
-            select(Result).where(Result.ts >= since).order_by(Result.ts.desc()).limit(5000)
-        ).all()
+async def recent_results(minutes: int = 60):
+    since = utcnow() - timedelta(minutes=max(1, minutes))
+    async with session_scope() as s:
+        rows = (await s.exec(
+            select(*_RESULT_COLS).where(Result.ts >= since).order_by(Result.ts.desc()).limit(5000)
+        )).all()
+    return ORJSONResponse([r._asdict() for r in rows])
 
 
-@router.get("/alerts")
-def list_alerts(limit: int = 200):
-    with session_scope() as s:
-        return s.exec(
-            select(AlertEvent).order_by(AlertEvent.ts.desc()).limit(min(1000, limit))
-        ).all()
+@router.get("/status/current")
+async def current_status():
+    """
+    Latest status, latency and streaks per check, as maintained by the scheduler.
+    """
+    async with session_scope() as s:
+        rows = (await s.exec(select(CheckStatus))).all()
+    return ORJSONResponse([r.model_dump() for r in rows])
 
 
-@router.get("/incidents")
-def list_incidents(state: str = "open", limit: int = 200):
-    state = state.lower()
-    if state not in ("open", "closed", "all"):
-        raise HTTPException(400, "state must be open|closed|all")
+async def _query_alerts(limit: int) -> list:
+    async with session_scope() as s:
+        rows = (await s.exec(
+            select(*_ALERT_COLS).order_by(AlertEvent.ts.desc()).limit(min(1000, limit))
+        )).all()
+    return [r._asdict() for r in rows]
+
 
-    with session_scope() as s:
-        q = select(Incident).order_by(Incident.opened_ts.desc())
+async def _query_incidents(state: str, limit: int) -> list:
+    async with session_scope() as s:
+        q = select(*_INCIDENT_COLS).order_by(Incident.opened_ts.desc())
         if state != "all":
             q = q.where(Incident.state == state)
-        return s.exec(q.limit(min(1000, limit))).all()
+        rows = (await s.exec(q.limit(min(1000, limit)))).all()
+    return [r._asdict() for r in rows]
 
 
-@router.get("/uptime/summary")
-def uptime_summary(minutes: int = 1440):
+async def _query_uptime(minutes: int, limit: Optional[int] = None, skip_empty: bool = False) -> list:
     """
-    Returns per-device availability over the last N minutes.
-    Availability definition:
-      - up/degraded count as available
-      - down counts as unavailable
+    Per-device availability, worst first (devices with no samples last).
+    limit / skip_empty are applied in SQL, so a caller that only shows the
+    worst few devices never pulls the rest.
     """
-    minutes = max(5, int(minutes))
-    since = datetime.utcnow() - timedelta(minutes=minutes)
-
-    with session_scope() as s:
-        devices = s.exec(select(Device)).all()
-        checks = s.exec(select(Check)).all()
-        check_to_device = {c.id: c.device_id for c in checks}
-        results = s.exec(select(Result).where(Result.ts >= since)).all()
-
-    per_device = {
-        d.id: {
-            "device_id": d.id,
-            "device_name": d.name,
-            "site": d.site,
-            "available": 0,
-            "total": 0,
-        }
-        for d in devices
-    }
-
-    for r in results:
-        dev_id = check_to_device.get(r.check_id)
-        if dev_id is None:
-            continue
-        per_device[dev_id]["total"] += 1
-        if r.status in ("up", "degraded"):
-            per_device[dev_id]["available"] += 1
+    since = utcnow() - timedelta(minutes=minutes)
+    since = since.replace(second=0, microsecond=0)
+
+    # summed from the scheduler's per-minute buckets rather than raw Results
+    total_col = func.coalesce(func.sum(UptimeBucket.total), 0)
+    available_col = func.coalesce(func.sum(UptimeBucket.available), 0)
+    pct_col = case((total_col > 0, available_col * 100.0 / total_col), else_=0.0)
+    q = (
+        select(Device.id, Device.name, Device.site, total_col, available_col)
+        .select_from(Device)
+        .join(
+            UptimeBucket,
+            and_(UptimeBucket.device_id == Device.id, UptimeBucket.ts_minute >= since),
+            isouter=True,
+        )
+        .group_by(Device.id)
+        .order_by(total_col == 0, pct_col)
+    )
+    if skip_empty:
+        q = q.having(total_col > 0)
+    if limit is not None:
+        q = q.limit(max(1, min(1000, limit)))
+
+    async with session_scope() as s:
+        grouped = (await s.exec(q)).all()
 
     rows = []
-    for _, agg in per_device.items():
-        total = agg["total"]
-        avail = agg["available"]
+    for dev_id, name, site, total, avail in grouped:
         pct = (avail / total * 100.0) if total else 0.0
         rows.append({
-            **agg,
+            "device_id": dev_id,
+            "device_name": name,
+            "site": site,
+            "available": avail,
+            "total": total,
             "uptime_pct": round(pct, 2),
             "window_minutes": minutes,
         })
-
-    rows.sort(key=lambda x: (x["total"] == 0, x["uptime_pct"]))
     return rows
 
+
+def _check_state(state: str) -> str:
+    state = state.lower()
+    if state not in ("open", "closed", "all"):
+        raise HTTPException(400, "state must be open|closed|all")
+    return state
+
+
+@router.get("/alerts")
+async def list_alerts(limit: int = 200):
+    return ORJSONResponse(await _query_alerts(limit))
+
+
+@router.get("/incidents")
+async def list_incidents(state: str = "open", limit: int = 200):
+    return ORJSONResponse(await _query_incidents(_check_state(state), limit))
+
+
+@router.get("/uptime/summary")
+async def uptime_summary(minutes: int = 1440, limit: Optional[int] = None, skip_empty: bool = False):
+    """
+    Returns per-device availability over the last N minutes, worst first.
+    Availability definition:
+      - up/degraded count as available
+      - down counts as unavailable
+    limit caps the number of devices returned; skip_empty leaves out devices
+    with no samples in the window.
+    """
+    return ORJSONResponse(await _query_uptime(max(5, int(minutes)), limit, skip_empty))
+
+
+@router.get("/dashboard")
+async def dashboard(
+    alert_limit: int = 50,
+    incident_state: str = "open",
+    incident_limit: int = 50,
+    uptime: bool = True,
+    minutes: int = 1440,
+    uptime_limit: Optional[int] = None,
+    uptime_skip_empty: bool = False,
+):
+    """
+    Everything the dashboard polls, in one round trip:
+    {"alerts": [...], "incidents": [...], "uptime": [...]}.
+    Pass uptime=false to leave the (slower-moving) uptime summary out;
+    uptime_limit / uptime_skip_empty work as on /uptime/summary.
+    """
+    payload = {
+        "alerts": await _query_alerts(alert_limit),
+        "incidents": await _query_incidents(_check_state(incident_state), incident_limit),
+    }
+    if uptime:
+        payload["uptime"] = await _query_uptime(max(5, int(minutes)), uptime_limit, uptime_skip_empty)
+    return ORJSONResponse(payload)
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import Request, Response
+
+
+# Per-endpoint TTL tiers (seconds) for cacheable GETs; anything not listed
+# goes straight to the handler.
+CACHE_TTLS: Dict[str, float] = {
+    "/api/devices": 2.0,
+    "/api/results/recent": 5.0,
+    "/api/alerts": 15.0,
+    "/api/incidents": 15.0,
+    "/api/uptime/summary": 60.0,
+    "/api/dashboard": 5.0,
+}
+
+# Recomputed by Response on replay, so not stored with the entry.
+_REBUILT_HEADERS = (b"content-length", b"content-type")
+
+
+class _Entry:
+    __slots__ = ("expires_at", "hits", "body", "media_type", "headers", "etag")
+
+    def __init__(
+        self,
+        expires_at: float,
+        body: bytes,
+        media_type: Optional[str],
+        headers: List[Tuple[bytes, bytes]],
+    ) -> None:
+        self.expires_at = expires_at
+        self.hits = 0
+        self.body = body
+        self.media_type = media_type
+        self.headers = headers
+        # hashed once per fill; an unchanged body keeps its tag across refills
+        self.etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+
+class ResponseCache:
+    """
+    In-process cache of serialized response bodies keyed by path + query.
+
+    A hit skips the handler, the ORM and JSON encoding entirely. When full,
+    the least frequently hit entry is evicted.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self._data: Dict[str, _Entry] = {}
+        # key -> [lock, holders + waiters] while a fill for that key is in
+        # flight, so a burst of identical requests runs the handler once
+        self._locks: Dict[str, list] = {}
+
+    def get(self, key: str) -> Optional[_Entry]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        entry.hits += 1
+        return entry
+
+    def put(
+        self,
+        key: str,
+        ttl: float,
+        body: bytes,
+        media_type: Optional[str],
+        headers: List[Tuple[bytes, bytes]],
+    ) -> _Entry:
+        if key not in self._data and len(self._data) >= self.max_entries:
+            now = time.monotonic()
+            expired = [k for k, e in self._data.items() if e.expires_at <= now]
+            for k in expired:
+                del self._data[k]
+            if len(self._data) >= self.max_entries:
+                del self._data[min(self._data, key=lambda k: self._data[k].hits)]
+        entry = self._data[key] = _Entry(time.monotonic() + ttl, body, media_type, headers)
+        return entry
+
+    @asynccontextmanager
+    async def filling(self, key: str) -> AsyncIterator[None]:
+        # the lock is dropped with its last user, so client-chosen keys
+        # cannot pile up locks beyond the requests actually in flight
+        slot = self._locks.get(key)
+        if slot is None:
+            slot = self._locks[key] = [asyncio.Lock(), 0]
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                yield
+        finally:
+            slot[1] -= 1
+            if slot[1] == 0:
+                del self._locks[key]
+
+    def invalidate(self, prefix: str = "") -> None:
+        stale: List[str] = [k for k in self._data if k.startswith(prefix)]
+        for k in stale:
+            del self._data[k]
+
+
+response_cache = ResponseCache()
+
+
+async def cache_middleware(request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+    path = request.url.path
+
+    if request.method != "GET":
+        response = await call_next(request)
+        if path.startswith("/api/") and response.status_code < 400:
+            response_cache.invalidate("/api/")
+        return response
+
+    ttl = CACHE_TTLS.get(path)
+    if ttl is None:
+        return await call_next(request)
+
+    key = f"{path}?{request.url.query}"
+    entry = response_cache.get(key)
+    if entry is None:
+        async with response_cache.filling(key):
+            entry = response_cache.get(key)
+            if entry is None:
+                response = await call_next(request)
+                if response.status_code != 200:
+                    return response
+                media_type = response.headers.get("content-type")
+                body = b"".join([chunk async for chunk in response.body_iterator])
+                headers = [(k, v) for k, v in response.raw_headers if k not in _REBUILT_HEADERS]
+                entry = response_cache.put(key, ttl, body, media_type, headers)
+
+    # pollers send back the tag they last saw; if it still matches, skip the body
+    if request.headers.get("if-none-match") == entry.etag:
+        return Response(status_code=304, headers={"ETag": entry.etag})
+    response = Response(content=entry.body, media_type=entry.media_type, headers={"ETag": entry.etag})
+    response.raw_headers.extend(entry.headers)
+    return response
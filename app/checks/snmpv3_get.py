@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import os
 import time
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Optional, Tuple
 
 from pysnmp.hlapi.asyncio import (
     SnmpEngine,
@@ -19,6 +19,16 @@ from pysnmp.hlapi.asyncio import (
     usmDESPrivProtocol,
     usmAesCfb128Protocol,
 )
+from pysnmp.proto.rfc1902 import (
+    Counter32,
+    Counter64,
+    Gauge32,
+    Integer,
+    IpAddress,
+    OctetString,
+    TimeTicks,
+    Unsigned32,
+)
 
 from .base import BaseCheck, CheckOutcome
 
@@ -36,6 +46,26 @@ _PRIV = {
 }
 
 
+_DEFAULT_OIDS = (
+    "1.3.6.1.2.1.1.3.0",   # sysUpTime.0
+    "1.3.6.1.2.1.1.5.0",   # sysName.0
+)
+
+_INT_TYPES = (TimeTicks, Integer, Unsigned32, Counter32, Counter64, Gauge32)
+
+
+def _plain_value(val: Any) -> Any:
+    """
+    Map common varbind types straight to int/str instead of going through
+    prettyPrint(); anything else (IpAddress, OIDs, noSuch*) keeps prettyPrint.
+    """
+    if isinstance(val, _INT_TYPES):
+        return int(val)
+    if isinstance(val, OctetString) and not isinstance(val, IpAddress):
+        return val.asOctets().decode("utf-8", "replace")
+    return val.prettyPrint()
+
+
 def _resolve_secret(value: Any) -> Any:
     """
     Allows params like "env:SONICWALL_SNMP_AUTH" to pull from environment variables.
@@ -49,24 +79,39 @@ def _resolve_secret(value: Any) -> Any:
 class SNMPv3GetCheck(BaseCheck):
     kind = "snmpv3_get"
 
-    async def run(self, host: str, timeout_s: float, params: Dict[str, Any]) -> CheckOutcome:
-        # NOTE: host should be an IP/DNS like "192.168.10.1" (not "https://...")
-        port = int(params.get("port", 161))
-        username = _resolve_secret(params.get("username", ""))
-        auth_key = _resolve_secret(params.get("auth_key", ""))
-        priv_key = _resolve_secret(params.get("priv_key", ""))
-        auth_proto = _AUTH.get(str(params.get("auth_proto", "SHA")).upper(), usmHMACSHAAuthProtocol)
-        priv_proto = _PRIV.get(str(params.get("priv_proto", "AES")).upper(), usmAesCfb128Protocol)
-
-        # Minimal safe defaults: require auth+priv unless you explicitly set NONE
-        if not username:
-            return CheckOutcome("down", None, {"error": "missing username"})
-
-        oids = params.get("oids") or [
-            "1.3.6.1.2.1.1.3.0",   # sysUpTime.0
-            "1.3.6.1.2.1.1.5.0",   # sysName.0
-        ]
-        context_name = params.get("context_name", "")
+    def __init__(self) -> None:
+        super().__init__()
+        # session key (see _parse) -> (engine, user, target, context)
+        # Reusing the engine keeps its discovered engineID and localized keys,
+        # so only the first poll per target pays for discovery + key derivation.
+        self._engines: Dict[tuple, Tuple[SnmpEngine, UsmUserData, UdpTransportTarget, ContextData]] = {}
+        # oid strings -> ObjectTypes; the key doubles as the response value keys
+        self._var_binds: Dict[Tuple[str, ...], Tuple[ObjectType, ...]] = {}
+
+    def _bindings(self, oids: Any) -> Tuple[Tuple[str, ...], Tuple[ObjectType, ...]]:
+        sig = tuple(str(oid) for oid in oids)
+        var_binds = self._var_binds.get(sig)
+        if var_binds is None:
+            var_binds = tuple(ObjectType(ObjectIdentity(oid)) for oid in sig)
+            self._var_binds[sig] = var_binds
+        return sig, var_binds
+
+    def _session(
+        self,
+        key: tuple,
+        host: str,
+        port: int,
+        timeout_s: float,
+        username: str,
+        auth_key: Any,
+        priv_key: Any,
+        auth_proto: Any,
+        priv_proto: Any,
+        context_name: str,
+    ) -> Tuple[SnmpEngine, UsmUserData, UdpTransportTarget, ContextData]:
+        cached = self._engines.get(key)
+        if cached is not None:
+            return cached
 
         # Build SNMPv3 user
         user = UsmUserData(
@@ -76,22 +121,102 @@ class SNMPv3GetCheck(BaseCheck):
             authProtocol=auth_proto if auth_key else usmNoAuthProtocol,
             privProtocol=priv_proto if priv_key else usmNoPrivProtocol,
         )
+        target = UdpTransportTarget((host, port), timeout=float(timeout_s), retries=0)
+        context = ContextData(contextName=context_name) if context_name else ContextData()
+
+        session = (SnmpEngine(), user, target, context)
+        self._engines[key] = session
+        return session
+
+    def _evict(self, key: tuple) -> None:
+        session = self._engines.pop(key, None)
+        if session is None:
+            return
+        # an engine owns UDP sockets through its dispatcher; close them
+        dispatcher = session[0].transportDispatcher
+        if dispatcher is not None:
+            try:
+                dispatcher.closeDispatcher()
+            except Exception:
+                pass
+
+    def retain(self, keys: Iterable[tuple]) -> None:
+        """
+        Called by the scheduler after a reload with the session keys that
+        prepare() returned; engines for any other key (removed checks,
+        changed params) are closed.
+        """
+        keep = set(keys)
+        for key in [k for k in self._engines if k not in keep]:
+            self._evict(key)
+
+    def _parse(self, host: str, timeout_s: float, params: Dict[str, Any]) -> Dict[str, Any]:
+        port = int(params.get("port", 161))
+        username = str(_resolve_secret(params.get("username", "")))
+        auth_key = _resolve_secret(params.get("auth_key", ""))
+        priv_key = _resolve_secret(params.get("priv_key", ""))
+        auth_proto = _AUTH.get(str(params.get("auth_proto", "SHA")).upper(), usmHMACSHAAuthProtocol)
+        priv_proto = _PRIV.get(str(params.get("priv_proto", "AES")).upper(), usmAesCfb128Protocol)
+        context_name = params.get("context_name", "")
+
+        return {
+            "key": (
+                host, port, float(timeout_s), username, auth_proto, priv_proto,
+                hash(auth_key), hash(priv_key), context_name,
+            ),
+            "host": host,
+            "port": port,
+            "timeout_s": timeout_s,
+            "username": username,
+            "auth_key": auth_key,
+            "priv_key": priv_key,
+            "auth_proto": auth_proto,
+            "priv_proto": priv_proto,
+            "context_name": context_name,
+        }
+
+    def prepare(self, host: str, timeout_s: float, params: Dict[str, Any]) -> Optional[tuple]:
+        """
+        Called by the scheduler when a check is (re)loaded: builds the SNMP
+        session and OID bindings up front so run() only does lookups.
+        Returns the session key, for retain().
+        """
+        cfg = self._parse(host, timeout_s, params)
+        if not cfg["username"]:
+            return None
+        self._session(**cfg)
+        self._bindings(params.get("oids") or _DEFAULT_OIDS)
+        return cfg["key"]
+
+    async def run(self, host: str, timeout_s: float, params: Dict[str, Any]) -> CheckOutcome:
+        # NOTE: host should be an IP/DNS like "192.168.10.1" (not "https://...")
+        cfg = self._parse(host, timeout_s, params)
+        port = cfg["port"]
+        key = cfg["key"]
+
+        # Minimal safe defaults: require auth+priv unless you explicitly set NONE
+        if not cfg["username"]:
+            return CheckOutcome("down", None, {"error": "missing username"})
+
+        oids = params.get("oids") or _DEFAULT_OIDS
 
         t0 = time.perf_counter()
         try:
-            engine = SnmpEngine()
-            target = UdpTransportTarget((host, port), timeout=float(timeout_s), retries=0)
-            context = ContextData(contextName=context_name) if context_name else ContextData()
+            engine, user, target, context = self._session(**cfg)
 
-            var_binds = [ObjectType(ObjectIdentity(str(oid))) for oid in oids]
+            oid_keys, var_binds = self._bindings(oids)
 
+            # Numeric OIDs only: skip resolving the response back through the MIB
+            # tree, which is pure-Python work on every varbind.
             error_indication, error_status, error_index, binds = await getCmd(
-                engine, user, target, context, *var_binds
+                engine, user, target, context, *var_binds, lookupMib=False
             )
 
             latency_ms = (time.perf_counter() - t0) * 1000.0
 
             if error_indication:
+                # drop the session so the next poll rediscovers (e.g. agent rebooted)
+                self._evict(key)
                 return CheckOutcome("down", None, {"error": str(error_indication)})
 
             if error_status:
@@ -101,12 +226,14 @@ class SNMPv3GetCheck(BaseCheck):
                     {"error": f"{error_status.prettyPrint()} at {int(error_index)}"},
                 )
 
+            # GET responses come back in request order
             values: Dict[str, Any] = {}
-            for oid, val in binds:
-                values[str(oid)] = val.prettyPrint()
+            for oid_key, (_, val) in zip(oid_keys, binds):
+                values[oid_key] = _plain_value(val)
 
             return CheckOutcome("up", latency_ms, {"port": port, "values": values})
 
         except Exception as e:
+            self._evict(key)
             return CheckOutcome("down", None, {"error": str(e), "port": port})
 
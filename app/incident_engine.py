@@ -1,25 +1,28 @@
 from __future__ import annotations
 
 from datetime import datetime
+from typing import Dict
 from sqlmodel import select
 
 from .db import session_scope
 from .models import Incident
 
 
-def _find_open_incident(check_id: int) -> Incident | None:
-    with session_scope() as s:
-        return s.exec(
-            select(Incident)
-            .where(Incident.check_id == check_id)
+async def load_open_incidents() -> Dict[int, int]:
+    """
+    Returns {check_id: incident_id} for every open incident (newest wins).
+    """
+    async with session_scope() as s:
+        rows = (await s.exec(
+            select(Incident.check_id, Incident.id)
             .where(Incident.state == "open")
-            .order_by(Incident.opened_ts.desc())
-            .limit(1)
-        ).first()
+            .order_by(Incident.opened_ts.asc())
+        )).all()
+    return {check_id: inc_id for check_id, inc_id in rows}
 
 
-def open_incident(device_id: int, check_id: int, ts: datetime, reason: str, meta: dict) -> Incident:
-    with session_scope() as s:
+async def open_incident(device_id: int, check_id: int, ts: datetime, reason: str, meta: dict) -> Incident:
+    async with session_scope() as s:
         inc = Incident(
             device_id=device_id,
             check_id=check_id,
@@ -29,14 +32,14 @@ def open_incident(device_id: int, check_id: int, ts: datetime, reason: str, meta
             meta=meta or {},
         )
         s.add(inc)
-        s.commit()
-        s.refresh(inc)
+        await s.commit()
+        await s.refresh(inc)
         return inc
 
 
-def close_incident(incident_id: int, ts: datetime, reason: str, meta_update: dict | None = None) -> None:
-    with session_scope() as s:
-        inc = s.get(Incident, incident_id)
+async def close_incident(incident_id: int, ts: datetime, reason: str, meta_update: dict | None = None) -> None:
+    async with session_scope() as s:
+        inc = await s.get(Incident, incident_id)
         if not inc:
             return
         inc.state = "closed"
@@ -45,10 +48,10 @@ def close_incident(incident_id: int, ts: datetime, reason: str, meta_update: dic
         if meta_update:
             inc.meta = {**(inc.meta or {}), **meta_update}
         s.add(inc)
-        s.commit()
+        await s.commit()
 
 
-def process_status_transition(
+async def process_status_transition(
     *,
     device_id: int,
     check_id: int,
@@ -58,9 +61,14 @@ def process_status_transition(
     up_streak: int,
     open_after_downs: int,
     close_after_ups: int,
+    open_incidents: Dict[int, int],
 ) -> dict:
     """
     Returns an event dict (or {}) so the scheduler can broadcast to UI.
+    The event's "ts" is left as a datetime for the scheduler's serializer.
+
+    `open_incidents` is the caller's {check_id: incident_id} map of open
+    incidents; it is consulted instead of the DB and updated in place.
 
     Rules:
     - Open incident when down_streak >= open_after_downs and no open incident exists.
@@ -70,11 +78,11 @@ def process_status_transition(
     """
     event: dict = {}
 
-    open_inc = _find_open_incident(check_id=check_id)
+    open_inc_id = open_incidents.get(check_id)
 
     if status == "down":
-        if open_inc is None and down_streak >= open_after_downs:
-            inc = open_incident(
+        if open_inc_id is None and down_streak >= open_after_downs:
+            inc = await open_incident(
                 device_id=device_id,
                 check_id=check_id,
                 ts=ts,
@@ -84,17 +92,18 @@ def process_status_transition(
                     "down_streak": down_streak,
                 },
             )
+            open_incidents[check_id] = inc.id
             event = {
                 "type": "incident_opened",
                 "incident_id": inc.id,
                 "device_id": device_id,
                 "check_id": check_id,
-                "ts": ts.isoformat() + "Z",
+                "ts": ts,
             }
     else:
-        if open_inc is not None and up_streak >= close_after_ups:
-            close_incident(
-                incident_id=open_inc.id,
+        if open_inc_id is not None and up_streak >= close_after_ups:
+            await close_incident(
+                incident_id=open_inc_id,
                 ts=ts,
                 reason="up_streak",
                 meta_update={
@@ -102,12 +111,13 @@ def process_status_transition(
                     "up_streak": up_streak,
                 },
             )
+            open_incidents.pop(check_id, None)
             event = {
                 "type": "incident_closed",
-                "incident_id": open_inc.id,
+                "incident_id": open_inc_id,
                 "device_id": device_id,
                 "check_id": check_id,
-                "ts": ts.isoformat() + "Z",
+                "ts": ts,
             }
 
     return event
@@ -2,40 +2,101 @@ from __future__ import annotations
 
 import asyncio
 from fastapi import FastAPI, WebSocket
+from fastapi.responses import ORJSONResponse
 from nicegui import ui
 import uvicorn
-from sqlmodel import select
+from sqlmodel import SQLModel, select
 
 from .db import init_db, session_scope
-from .models import Device, Check
+from .models import Device, Check, Result, Incident, CheckStatus, UptimeBucket
+from .netdash.timeutil import utcnow
 from .api import router as api_router
+from .cache import cache_middleware
 from .ws import WebSocketHub
 from .scheduler import MonitorScheduler
 
 hub = WebSocketHub()
 scheduler = MonitorScheduler(hub)
 
-app = FastAPI(title="NetDash")
+app = FastAPI(title="NetDash", default_response_class=ORJSONResponse)
 app.include_router(api_router)
+app.middleware("http")(cache_middleware)
+
+
+# single-column indexes from older schemas, superseded by the composite
+# ix_result_check_ts / ix_result_ts_check / ix_incident_state_opened
+_REPLACED_INDEXES = ("ix_result_ts", "ix_result_check_id", "ix_incident_state")
+
+
+async def _upgrade_schema() -> None:
+    """
+    Bring a database created by an older NetDash up to the current schema:
+      - create the CheckStatus / UptimeBucket tables
+      - add Result.samples (coalesced rows; existing rows count as 1)
+      - backfill UptimeBucket from the retained Result history, so the
+        uptime panel keeps its numbers across the upgrade
+      - create the result / incident indexes and drop the single-column
+        ones they replace, so inserts don't maintain both sets
+    Every step is a no-op on a database that already has it. SQLite cannot
+    add the Result.check_id foreign key to an existing table; old databases
+    keep working without it, and a dump + reload into a fresh file picks it up.
+    """
+    def upgrade(sync_session) -> None:
+        conn = sync_session.connection()
+        SQLModel.metadata.create_all(conn, tables=[CheckStatus.__table__, UptimeBucket.__table__])
+        cols = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(result)")}
+        if "samples" not in cols:
+            conn.exec_driver_sql("ALTER TABLE result ADD COLUMN samples INTEGER NOT NULL DEFAULT 1")
+
+        # only into an empty bucket table: init_db may already have created
+        # it, and once the scheduler has written buckets they are the truth.
+        # ts_minute uses SQLAlchemy's stored datetime format so backfilled
+        # minutes collide with (rather than duplicate) live ones.
+        if conn.exec_driver_sql("SELECT 1 FROM uptimebucket LIMIT 1").first() is None:
+            since = (utcnow() - scheduler.uptime_retention).strftime("%Y-%m-%d %H:%M:%S.%f")
+            conn.exec_driver_sql(
+                """
+                INSERT INTO uptimebucket (device_id, ts_minute, available, total)
+                SELECT c.device_id,
+                       strftime('%Y-%m-%d %H:%M:00.000000', r.ts),
+                       SUM(CASE WHEN r.status IN ('up', 'degraded') THEN r.samples ELSE 0 END),
+                       SUM(r.samples)
+                FROM result r JOIN "check" c ON c.id = r.check_id
+                WHERE r.ts >= ?
+                GROUP BY 1, 2
+                ON CONFLICT DO NOTHING
+                """,
+                (since,),
+            )
+        for table in (Result.__table__, Incident.__table__):
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+        for name in _REPLACED_INDEXES:
+            conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+
+    async with session_scope() as s:
+        await s.run_sync(upgrade)
+        await s.commit()
 
 
 @app.on_event("startup")
 async def startup() -> None:
-    init_db()
+    await init_db()
+    await _upgrade_schema()
 
-    with session_scope() as s:
-        if not s.exec(select(Device)).first():
+    async with session_scope() as s:
+        if not (await s.exec(select(Device))).first():
             d1 = Device(name="Localhost", host="127.0.0.1", site="Lab", tags="demo")
             d2 = Device(name="Google DNS", host="8.8.8.8", site="WAN", tags="public")
             s.add(d1)
             s.add(d2)
-            s.commit()
-            s.refresh(d1)
-            s.refresh(d2)
+            await s.commit()
+            await s.refresh(d1)
+            await s.refresh(d2)
 
             s.add(Check(device_id=d1.id, kind="ping", interval_s=10, timeout_s=2, params={"count": 1}))
             s.add(Check(device_id=d2.id, kind="ping", interval_s=10, timeout_s=2, params={"count": 1}))
-            s.commit()
+            await s.commit()
 
     await scheduler.start()
 
@@ -4,7 +4,7 @@ import argparse
 import asyncio
 from pathlib import Path
 
-from .db import init_db, add_host, list_hosts, write_ping, latest_status
+from .db import init_db, add_host, list_hosts, write_ping, write_pings, latest_status
 from .ping import ping_once
 
 
@@ -61,8 +61,9 @@ async def cmd_run(args: argparse.Namespace) -> int:
         while True:
             # fan out pings concurrently
             results = await asyncio.gather(*(ping_once(h, timeout_s=args.timeout) for h in hosts))
+            # one transaction per tick rather than one per host
+            await write_pings(args.db, [(r.host, r.ok, r.rtt_ms, r.error) for r in results])
             for r in results:
-                await write_ping(args.db, r.host, r.ok, r.rtt_ms, r.error)
                 status = "OK" if r.ok else "FAIL"
                 rtt = f"{r.rtt_ms:.1f}ms" if r.rtt_ms is not None else "-"
                 print(f"{r.host:30} {status:4}  rtt={rtt}")
@@ -3,9 +3,14 @@ from __future__ import annotations
 import os
 import sqlite3
 import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime
-from typing import Iterable
+from typing import Callable, Iterable, TypeVar
+
+from .timeutil import utcnow
+
+T = TypeVar("T")
 
 
 SCHEMA = """
@@ -30,22 +35,47 @@ CREATE INDEX IF NOT EXISTS idx_ping_results_host_ts ON ping_results(host, ts);
 """
 
 
+# One connection and one worker thread per DB path for the life of the process:
+# the page cache stays warm, PRAGMAs run once, and every statement for a given
+# DB is serialized on its thread (SQLite allows a single writer anyway).
+_conns: dict[Path, sqlite3.Connection] = {}
+_executors: dict[Path, ThreadPoolExecutor] = {}
+_lock = threading.Lock()
+
+
 def _connect(db_path: Path) -> sqlite3.Connection:
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
-    conn.execute("PRAGMA foreign_keys=ON;")
-    return conn
+    with _lock:
+        conn = _conns.get(db_path)
+        if conn is None:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA foreign_keys=ON;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            conn.execute("PRAGMA cache_size=-20000;")
+            conn.execute("PRAGMA temp_store=MEMORY;")
+            _conns[db_path] = conn
+        return conn
+
+
+def _executor(db_path: Path) -> ThreadPoolExecutor:
+    with _lock:
+        ex = _executors.get(db_path)
+        if ex is None:
+            ex = ThreadPoolExecutor(max_workers=1, thread_name_prefix="netdash-db")
+            _executors[db_path] = ex
+        return ex
+
+
+async def _run(db_path: Path, fn: Callable[[], T]) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor(db_path), fn)
 
 
 async def init_db(db_path: Path) -> None:
     def _init() -> None:
-        conn = _connect(db_path)
-        try:
-            conn.executescript(SCHEMA)
-        finally:
-            conn.close()
+        _connect(db_path).executescript(SCHEMA)
 
-    await asyncio.to_thread(_init)
+    await _run(db_path, _init)
 
 
 async def add_host(db_path: Path, name: str) -> None:
@@ -54,60 +84,68 @@ async def add_host(db_path: Path, name: str) -> None:
         raise ValueError("Host name cannot be empty.")
 
     def _add() -> None:
-        conn = _connect(db_path)
-        try:
-            conn.execute(
-                "INSERT OR IGNORE INTO hosts(name, created_at) VALUES(?, ?)",
-                (name, datetime.utcnow().isoformat()),
-            )
-        finally:
-            conn.close()
+        _connect(db_path).execute(
+            "INSERT OR IGNORE INTO hosts(name, created_at) VALUES(?, ?)",
+            (name, utcnow().isoformat()),
+        )
 
-    await asyncio.to_thread(_add)
+    await _run(db_path, _add)
 
 
 async def list_hosts(db_path: Path) -> list[str]:
     def _list() -> list[str]:
-        conn = _connect(db_path)
-        try:
-            cur = conn.execute("SELECT name FROM hosts ORDER BY name ASC")
-            return [row[0] for row in cur.fetchall()]
-        finally:
-            conn.close()
+        cur = _connect(db_path).execute("SELECT name FROM hosts ORDER BY name ASC")
+        return [row[0] for row in cur.fetchall()]
 
-    return await asyncio.to_thread(_list)
+    return await _run(db_path, _list)
 
 
 async def write_ping(db_path: Path, host: str, ok: bool, rtt_ms: float | None, error: str | None) -> None:
+    def _write() -> None:
+        _connect(db_path).execute(
+            "INSERT INTO ping_results(host, ok, rtt_ms, ts, error) VALUES(?, ?, ?, ?, ?)",
+            (host, 1 if ok else 0, rtt_ms, utcnow().isoformat(), error),
+        )
+
+    await _run(db_path, _write)
+
+
+async def write_pings(db_path: Path, rows: Iterable[tuple[str, bool, float | None, str | None]]) -> None:
+    """
+    Write a batch of (host, ok, rtt_ms, error) rows in one transaction,
+    so a monitor tick costs a single commit regardless of host count.
+    """
+    ts = utcnow().isoformat()
+    params = [(host, 1 if ok else 0, rtt_ms, ts, error) for host, ok, rtt_ms, error in rows]
+
     def _write() -> None:
         conn = _connect(db_path)
+        conn.execute("BEGIN")
         try:
-            conn.execute(
+            conn.executemany(
                 "INSERT INTO ping_results(host, ok, rtt_ms, ts, error) VALUES(?, ?, ?, ?, ?)",
-                (host, 1 if ok else 0, rtt_ms, datetime.utcnow().isoformat(), error),
+                params,
             )
-        finally:
-            conn.close()
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
 
-    await asyncio.to_thread(_write)
+    await _run(db_path, _write)
 
 
 async def latest_status(db_path: Path, limit: int = 50) -> list[tuple[str, int, float | None, str, str | None]]:
     def _q():
-        conn = _connect(db_path)
-        try:
-            cur = conn.execute(
-                """
-                SELECT host, ok, rtt_ms, ts, error
-                FROM ping_results
-                ORDER BY ts DESC
-                LIMIT ?
-                """,
-                (limit,),
-            )
-            return cur.fetchall()
-        finally:
-            conn.close()
-
-    return await asyncio.to_thread(_q)
+        cur = _connect(db_path).execute(
+            """
+            SELECT host, ok, rtt_ms, ts, error
+            FROM ping_results
+            ORDER BY ts DESC
+            LIMIT ?
+            """,
+            (limit,),
+        )
+        return cur.fetchall()
+
+    return await _run(db_path, _q)
 
@@ -1,9 +1,20 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional, Dict, Any
-from sqlmodel import SQLModel, Field, Column
-from sqlalchemy import JSON
+from typing import Optional, Dict, Any, List
+from sqlmodel import SQLModel, Field, Column, Relationship
+from sqlalchemy import JSON, Index
+from sqlalchemy.orm import relationship
+
+from .timeutil import utcnow
+
+
+# Relationships are declared lazy="raise": touching one that wasn't loaded
+# explicitly (selectinload/joinedload) raises instead of silently issuing a
+# SELECT per row. Targets are spelled out via sa_relationship because this
+# module uses postponed annotations.
+def _rel(target: str, back_populates: str) -> Any:
+    return Relationship(sa_relationship=relationship(target, back_populates=back_populates, lazy="raise"))
 
 
 class Device(SQLModel, table=True):
@@ -14,6 +25,8 @@ class Device(SQLModel, table=True):
     tags: str = ""  # comma-separated
     enabled: bool = True
 
+    checks: List["Check"] = _rel("Check", "device")
+
 
 class Check(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -24,19 +37,58 @@ class Check(SQLModel, table=True):
     # You can store incident thresholds in here, e.g. open_after_downs/close_after_ups
     params: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON))
 
+    device: Optional["Device"] = _rel("Device", "checks")
+    results: List["Result"] = _rel("Result", "check")
+
 
 class Result(SQLModel, table=True):
+    # (check_id, ts) serves per-check range scans such as the uptime summary,
+    # (ts, check_id) serves the "last N minutes" feed without a sort step
+    __table_args__ = (
+        Index("ix_result_check_ts", "check_id", "ts"),
+        Index("ix_result_ts_check", "ts", "check_id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    check_id: int = Field(index=True)
-    ts: datetime = Field(default_factory=datetime.utcnow, index=True)
+    check_id: int = Field(foreign_key="check.id")
+    ts: datetime = Field(default_factory=utcnow)
     status: str  # "up" | "down" | "degraded"
     latency_ms: Optional[float] = None
+    # number of ticks this row represents (steady ticks are coalesced by the scheduler)
+    samples: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
     details: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON))
 
+    check: Optional["Check"] = _rel("Check", "results")
+
+
+class CheckStatus(SQLModel, table=True):
+    """
+    Latest state per check, upserted by the scheduler every tick so current
+    status is served without looking at Result history.
+    """
+    check_id: int = Field(primary_key=True)
+    device_id: int = Field(index=True)
+    last_status: str  # "up" | "down" | "degraded"
+    last_ts: datetime
+    last_latency: Optional[float] = None
+    down_streak: int = 0
+    up_streak: int = 0
+
+
+class UptimeBucket(SQLModel, table=True):
+    """
+    Per-device, per-minute availability counters maintained by the scheduler,
+    so the uptime summary sums minutes instead of scanning Results.
+    """
+    device_id: int = Field(primary_key=True)
+    ts_minute: datetime = Field(primary_key=True)  # tick time floored to the minute
+    available: int = 0  # up/degraded ticks
+    total: int = 0
+
 
 class AlertEvent(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    ts: datetime = Field(default_factory=datetime.utcnow, index=True)
+    ts: datetime = Field(default_factory=utcnow, index=True)
     device_id: int = Field(index=True)
     check_id: int = Field(index=True)
     severity: str = "warn"  # "info"|"warn"|"crit"
@@ -45,13 +97,16 @@ class AlertEvent(SQLModel, table=True):
 
 
 class Incident(SQLModel, table=True):
+    # state filter + opened_ts ordering used by the incidents list
+    __table_args__ = (Index("ix_incident_state_opened", "state", "opened_ts"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
 
     device_id: int = Field(index=True)
     check_id: int = Field(index=True)
 
-    state: str = Field(default="open", index=True)  # "open"|"closed"
-    opened_ts: datetime = Field(default_factory=datetime.utcnow, index=True)
+    state: str = "open"  # "open"|"closed"
+    opened_ts: datetime = Field(default_factory=utcnow, index=True)
     closed_ts: Optional[datetime] = Field(default=None, index=True)
 
     open_reason: str = "down_streak"
@@ -3,18 +3,60 @@ from __future__ import annotations
 import asyncio
 import sys
 import re
-from datetime import datetime
 from .models import PingResult
+from .timeutil import utcnow
 
 
-_RTT_RE = re.compile(r"time[=<]\s*(\d+(?:\.\d+)?)\s*ms", re.IGNORECASE)
+try:
+    from icmplib import async_ping, ICMPLibError, SocketPermissionError
+except ImportError:  # icmplib is optional; without it we shell out to the ping binary
+    async_ping = None
+
+# bytes pattern: matched against raw stdout, no decode needed
+_RTT_RE = re.compile(rb"time[=<]\s*(\d+(?:\.\d+)?)\s*ms", re.IGNORECASE)
+
+# Flipped off the first time the OS refuses an unprivileged ICMP socket
+# (e.g. net.ipv4.ping_group_range excludes us), so we don't retry every tick.
+_icmp_available = async_ping is not None
 
 
 async def ping_once(host: str, timeout_s: int = 1) -> PingResult:
+    global _icmp_available
+
     host = host.strip()
     if not host:
-        return PingResult(host=host, ok=False, rtt_ms=None, ts=datetime.utcnow(), error="empty host")
+        return PingResult(host=host, ok=False, rtt_ms=None, ts=utcnow(), error="empty host")
+
+    if _icmp_available:
+        try:
+            return await _ping_icmp(host, timeout_s)
+        except SocketPermissionError:
+            _icmp_available = False
+
+    return await _ping_subprocess(host, timeout_s)
+
+
+async def _ping_icmp(host: str, timeout_s: int) -> PingResult:
+    # privileged=False uses SOCK_DGRAM ICMP sockets: no root or CAP_NET_RAW needed
+    try:
+        h = await async_ping(host, count=1, timeout=timeout_s, privileged=False)
+    except SocketPermissionError:
+        raise
+    except ICMPLibError as e:
+        return PingResult(host=host, ok=False, rtt_ms=None, ts=utcnow(), error=str(e) or type(e).__name__)
+    except Exception as e:
+        return PingResult(host=host, ok=False, rtt_ms=None, ts=utcnow(), error=str(e))
+
+    return PingResult(
+        host=host,
+        ok=h.is_alive,
+        rtt_ms=h.avg_rtt if h.is_alive else None,
+        ts=utcnow(),
+        error=None if h.is_alive else "no reply",
+    )
+
 
+async def _ping_subprocess(host: str, timeout_s: int) -> PingResult:
     if sys.platform.startswith("win"):
         # -n 1 = one echo request, -w timeout(ms)
         cmd = ["ping", "-n", "1", "-w", str(timeout_s * 1000), host]
@@ -29,13 +71,13 @@ async def ping_once(host: str, timeout_s: int = 1) -> PingResult:
             stderr=asyncio.subprocess.PIPE,
         )
         out_b, err_b = await proc.communicate()
-        out = (out_b or b"").decode(errors="replace")
-        err = (err_b or b"").decode(errors="replace").strip()
 
         ok = proc.returncode == 0
+        # stderr only matters for failures
+        err = None if ok else (err_b or b"").decode(errors="replace").strip()
 
         rtt = None
-        m = _RTT_RE.search(out)
+        m = _RTT_RE.search(out_b or b"")
         if m:
             try:
                 rtt = float(m.group(1))
@@ -46,13 +88,10 @@ async def ping_once(host: str, timeout_s: int = 1) -> PingResult:
             host=host,
             ok=ok,
             rtt_ms=rtt,
-            ts=datetime.utcnow(),
-            error=err if (err and not ok) else None,
+            ts=utcnow(),
+            error=err or None,
         )
     except FileNotFoundError:
-        return PingResult(host=host, ok=False, rtt_ms=None, ts=datetime.utcnow(), error="ping command not found")
+        return PingResult(host=host, ok=False, rtt_ms=None, ts=utcnow(), error="ping command not found")
     except Exception as e:
-        return PingResult(host=host, ok=False, rtt_ms=None, ts=datetime.utcnow(), error=str(e))
-
-
-
+        return PingResult(host=host, ok=False, rtt_ms=None, ts=utcnow(), error=str(e))
@@ -0,0 +1,10 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+
+def utcnow() -> datetime:
+    # naive UTC, same shape as the deprecated datetime.utcnow(); every
+    # timestamp in NetDash is one of these. Stdlib only, so the sqlite3
+    # store and the ping CLI can use it without pulling in sqlmodel.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
@@ -1,17 +1,25 @@
 from __future__ import annotations
 
 import asyncio
-from datetime import datetime
-from typing import Dict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 
+import orjson
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlmodel import select
 
+from .cache import response_cache
 from .db import session_scope
-from .models import Device, Check, Result
+from .models import Device, Check, Result, CheckStatus, UptimeBucket
+from .netdash.timeutil import utcnow
 from .checks import CHECKS
 from .ws import WebSocketHub
 from .alerts import maybe_emit_down_alert
-from .incident_engine import process_status_transition
+from .incident_engine import load_open_incidents, process_status_transition
+
+# naive datetimes in this codebase are UTC; serialize them as "...Z"
+_ORJSON_OPTS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
 
 
 class MonitorScheduler:
@@ -20,15 +28,50 @@ class MonitorScheduler:
         self._tasks: Dict[int, asyncio.Task] = {}
         self._stop = asyncio.Event()
 
+        # Results from every check loop funnel through one writer so a tick's
+        # rows share a transaction (and a WAL commit) instead of one each.
+        # None is the shutdown sentinel.
+        self._write_q: asyncio.Queue[Optional[Result]] = asyncio.Queue()
+        self._writer_task: Optional[asyncio.Task] = None
+        self.write_batch_max = 200
+        self.write_flush_s = 0.5
+
+        # (device_id, ts_minute) -> [available, total], counted per tick and
+        # upserted into UptimeBucket by the writer together with its batch
+        self._uptime_acc: Dict[Tuple[int, datetime], List[int]] = {}
+        self.uptime_retention = timedelta(days=7)
+        self.uptime_prune_every = timedelta(minutes=10)
+
+        # check_id -> latest CheckStatus row values; the writer upserts only
+        # the newest state per check, whatever number of ticks it covers
+        self._status_acc: Dict[int, Dict[str, object]] = {}
+
         # check_id -> {"down": int, "up": int}
         self._streaks: Dict[int, Dict[str, int]] = {}
 
+        # check_id -> open incident id, hydrated in reload() and kept current
+        # by process_status_transition so the hot loop never has to query it
+        self._open_incidents: Dict[int, int] = {}
+
+        # check_id -> invariant part of the "result" broadcast, built in reload()
+        self._bcast_tpl: Dict[int, Dict[str, object]] = {}
+
         # Defaults that work well for Wi-Fi-ish targets
         self.open_after_downs_default = 3
         self.close_after_ups_default = 2
 
+        # Steady ticks are coalesced: a tick with the same status and latency
+        # within coalesce_latency_pct of the last written row is only counted,
+        # and the count lands in Result.samples on the next written row.
+        # check_id -> (status, latency_ms, written_ts, skipped, last_skipped_ts)
+        self._last_written: Dict[int, Tuple[str, Optional[float], datetime, int, datetime]] = {}
+        self.coalesce_latency_pct = 0.1
+        self.coalesce_max_ticks = 30
+        self.coalesce_max_age = timedelta(minutes=5)
+
     async def start(self) -> None:
         self._stop.clear()
+        self._writer_task = asyncio.create_task(self._run_writer())
         await self.reload()
 
     async def stop(self) -> None:
@@ -43,6 +86,13 @@ class MonitorScheduler:
         if tasks:
             await asyncio.gather(*tasks, return_exceptions=True)
 
+        await self._flush_coalesced()
+
+        if self._writer_task:
+            await self._write_q.put(None)
+            await self._writer_task
+            self._writer_task = None
+
     async def reload(self) -> None:
         old = list(self._tasks.values())
         self._tasks.clear()
@@ -51,16 +101,195 @@ class MonitorScheduler:
         if old:
             await asyncio.gather(*old, return_exceptions=True)
 
-        with session_scope() as s:
-            checks = s.exec(select(Check)).all()
-            devices = {d.id: d for d in s.exec(select(Device)).all()}
+        await self._flush_coalesced()
+
+        async with session_scope() as s:
+            checks = (await s.exec(select(Check))).all()
+            devices = {d.id: d for d in (await s.exec(select(Device))).all()}
+
+        self._open_incidents = await load_open_incidents()
+        self._bcast_tpl = {}
+        # checker -> session keys its prepare() returned, for retain()
+        prepared: Dict[object, set] = {}
 
         for chk in checks:
             dev = devices.get(chk.device_id)
             if not dev or not dev.enabled:
                 continue
+            checker = CHECKS.get(chk.kind)
+            prepare = getattr(checker, "prepare", None)
+            if prepare is not None:
+                keys = prepared.setdefault(checker, set())
+                try:
+                    key = prepare(dev.host, chk.timeout_s, chk.params)
+                except Exception:
+                    key = None  # run() rebuilds lazily and reports the error per tick
+                if key is not None:
+                    keys.add(key)
+            self._bcast_tpl[chk.id] = {
+                "type": "result",
+                "device_id": dev.id,
+                "device_name": dev.name,
+                "host": dev.host,
+                "site": dev.site,
+                "check_id": chk.id,
+                "kind": chk.kind,
+            }
             self._tasks[chk.id] = asyncio.create_task(self._run_check_loop(dev, chk))
 
+        # let checkers close cached sessions no loaded check uses any more
+        for checker in set(CHECKS.values()):
+            retain = getattr(checker, "retain", None)
+            if retain is not None:
+                retain(prepared.get(checker, ()))
+
+    async def _run_writer(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_prune = utcnow()
+        done = False
+        while not done:
+            batch: List[Result] = []
+            try:
+                # time out so uptime counters still flush while every check is
+                # coalescing and no Result rows are queued
+                item = await asyncio.wait_for(self._write_q.get(), timeout=self.write_flush_s)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                if item is None:
+                    done = True
+                else:
+                    batch.append(item)
+                    t0 = loop.time()
+                    while len(batch) < self.write_batch_max and loop.time() - t0 < self.write_flush_s:
+                        try:
+                            item = self._write_q.get_nowait()
+                        except asyncio.QueueEmpty:
+                            await asyncio.sleep(0.05)
+                            continue
+                        if item is None:
+                            done = True
+                            break
+                        batch.append(item)
+
+            prune_before = None
+            now = utcnow()
+            if now >= next_prune:
+                prune_before = now - self.uptime_retention
+                next_prune = now + self.uptime_prune_every
+
+            if batch or self._uptime_acc or self._status_acc or prune_before:
+                await self._write_batch(batch, prune_before)
+
+    async def _write_batch(self, batch: List[Result], prune_before: Optional[datetime] = None) -> None:
+        acc, self._uptime_acc = self._uptime_acc, {}
+        statuses, self._status_acc = self._status_acc, {}
+        try:
+            async with session_scope() as s:
+                s.add_all(batch)
+                if acc:
+                    stmt = sqlite_insert(UptimeBucket).values([
+                        {"device_id": dev_id, "ts_minute": minute, "available": avail, "total": total}
+                        for (dev_id, minute), (avail, total) in acc.items()
+                    ])
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=["device_id", "ts_minute"],
+                        set_={
+                            "available": UptimeBucket.available + stmt.excluded.available,
+                            "total": UptimeBucket.total + stmt.excluded.total,
+                        },
+                    )
+                    await s.execute(stmt)
+                if statuses:
+                    stmt = sqlite_insert(CheckStatus).values(list(statuses.values()))
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=["check_id"],
+                        set_={
+                            col: stmt.excluded[col]
+                            for col in ("device_id", "last_status", "last_ts", "last_latency", "down_streak", "up_streak")
+                        },
+                    )
+                    await s.execute(stmt)
+                if prune_before is not None:
+                    await s.execute(delete(UptimeBucket).where(UptimeBucket.ts_minute < prune_before))
+                await s.commit()
+        except Exception as e:
+            # Result rows are dropped, but the counters and latest states are
+            # merged back so the next flush retries them; anything recorded
+            # since the swap is newer and wins for the status rows
+            for k, (avail, total) in acc.items():
+                bucket = self._uptime_acc.setdefault(k, [0, 0])
+                bucket[0] += avail
+                bucket[1] += total
+            for k, row in statuses.items():
+                self._status_acc.setdefault(k, row)
+            await self._broadcast({
+                "type": "scheduler_error",
+                "kind": "writer",
+                "error": str(e),
+                "dropped": len(batch),
+                "retrying_uptime_buckets": len(acc),
+                "retrying_statuses": len(statuses),
+            })
+
+    def _count_uptime(self, device_id: int, ts: datetime, status: str) -> None:
+        bucket = self._uptime_acc.setdefault((device_id, ts.replace(second=0, microsecond=0)), [0, 0])
+        if status in ("up", "degraded"):
+            bucket[0] += 1
+        bucket[1] += 1
+
+    async def _broadcast(self, msg: dict) -> None:
+        # serialize once; the hub fans the same bytes out to every client
+        await self.hub.broadcast_bytes(orjson.dumps(msg, option=_ORJSON_OPTS))
+
+    def _latency_close(self, prev: Optional[float], cur: Optional[float]) -> bool:
+        if prev is None or cur is None:
+            return prev is cur
+        return abs(cur - prev) / max(prev, 1.0) < self.coalesce_latency_pct
+
+    def _coalesce(self, res: Result) -> List[Result]:
+        """
+        Returns the rows to persist for this tick (possibly none).
+        """
+        prev = self._last_written.get(res.check_id)
+        rows: List[Result] = []
+
+        if prev is not None:
+            status, latency, written_ts, skipped, last_ts = prev
+            steady = res.status == status and self._latency_close(latency, res.latency_ms)
+
+            if steady and skipped + 1 < self.coalesce_max_ticks and res.ts - written_ts < self.coalesce_max_age:
+                self._last_written[res.check_id] = (status, latency, written_ts, skipped + 1, res.ts)
+                return rows
+
+            if steady:
+                # heartbeat: this row also stands in for the ticks we skipped
+                res.samples = skipped + 1
+            elif skipped:
+                rows.append(Result(
+                    check_id=res.check_id,
+                    ts=last_ts,
+                    status=status,
+                    latency_ms=latency,
+                    samples=skipped,
+                ))
+
+        rows.append(res)
+        self._last_written[res.check_id] = (res.status, res.latency_ms, res.ts, 0, res.ts)
+        return rows
+
+    async def _flush_coalesced(self) -> None:
+        for check_id, (status, latency, _, skipped, last_ts) in self._last_written.items():
+            if skipped:
+                await self._write_q.put(Result(
+                    check_id=check_id,
+                    ts=last_ts,
+                    status=status,
+                    latency_ms=latency,
+                    samples=skipped,
+                ))
+        self._last_written.clear()
+
     def _update_streaks(self, check_id: int, status: str) -> Dict[str, int]:
         st = self._streaks.setdefault(check_id, {"down": 0, "up": 0})
 
@@ -85,11 +314,13 @@ class MonitorScheduler:
 
         open_after_downs = int(chk.params.get("open_after_downs", self.open_after_downs_default))
         close_after_ups = int(chk.params.get("close_after_ups", self.close_after_ups_default))
+        bcast_tpl = self._bcast_tpl[chk.id]
 
         try:
             while not self._stop.is_set():
                 outcome = await checker.run(dev.host, chk.timeout_s, chk.params)
-                ts = datetime.utcnow()
+                # one clock read per tick, shared by the row, incident engine and broadcast
+                ts = utcnow()
 
                 res = Result(
                     check_id=chk.id,
@@ -99,13 +330,22 @@ class MonitorScheduler:
                     details=outcome.details,
                 )
 
-                with session_scope() as s:
-                    s.add(res)
-                    s.commit()
+                for row in self._coalesce(res):
+                    await self._write_q.put(row)
+                self._count_uptime(dev.id, ts, outcome.status)
 
                 st = self._update_streaks(chk.id, outcome.status)
+                self._status_acc[chk.id] = {
+                    "check_id": chk.id,
+                    "device_id": dev.id,
+                    "last_status": outcome.status,
+                    "last_ts": ts,
+                    "last_latency": outcome.latency_ms,
+                    "down_streak": st["down"],
+                    "up_streak": st["up"],
+                }
 
-                inc_event = process_status_transition(
+                inc_event = await process_status_transition(
                     device_id=dev.id,
                     check_id=chk.id,
                     ts=ts,
@@ -114,28 +354,27 @@ class MonitorScheduler:
                     up_streak=st["up"],
                     open_after_downs=open_after_downs,
                     close_after_ups=close_after_ups,
+                    open_incidents=self._open_incidents,
                 )
 
-                maybe_emit_down_alert(check_id=chk.id, device_id=dev.id)
+                await maybe_emit_down_alert(check_id=chk.id, device_id=dev.id)
 
-                await self.hub.broadcast_json({
-                    "type": "result",
-                    "device_id": dev.id,
-                    "device_name": dev.name,
-                    "host": dev.host,
-                    "site": dev.site,
-                    "check_id": chk.id,
-                    "kind": chk.kind,
-                    "ts": ts.isoformat() + "Z",
-                    "status": outcome.status,
-                    "latency_ms": outcome.latency_ms,
-                    "details": outcome.details,
-                    "down_streak": st["down"],
-                    "up_streak": st["up"],
-                })
+                msg = bcast_tpl.copy()
+                msg.update(
+                    ts=ts,
+                    status=outcome.status,
+                    latency_ms=outcome.latency_ms,
+                    details=outcome.details,
+                    down_streak=st["down"],
+                    up_streak=st["up"],
+                )
+                await self._broadcast(msg)
 
                 if inc_event:
-                    await self.hub.broadcast_json(inc_event)
+                    # the UI refetches incidents on this event; don't serve it a stale list
+                    response_cache.invalidate("/api/incidents")
+                    response_cache.invalidate("/api/dashboard")
+                    await self._broadcast(inc_event)
 
                 try:
                     await asyncio.wait_for(self._stop.wait(), timeout=chk.interval_s)
@@ -145,7 +384,7 @@ class MonitorScheduler:
         except asyncio.CancelledError:
             return
         except Exception as e:
-            await self.hub.broadcast_json({
+            await self._broadcast({
                 "type": "scheduler_error",
                 "device_id": dev.id,
                 "check_id": chk.id,
@@ -1,17 +1,57 @@
 from __future__ import annotations
 
 import asyncio
-from collections import defaultdict, deque
-from typing import Dict, Any, Deque
+import bisect
+import logging
+from collections import Counter, deque
+from typing import Counter as CounterT, Dict, Any, Deque, List, Optional, Tuple
 
-from nicegui import ui
+from nicegui import Client, app, background_tasks, ui
 import httpx
+import orjson
+
+log = logging.getLogger(__name__)
+
+
+# One pooled client for every dashboard page, so the periodic /api polls
+# reuse keep-alive connections instead of reconnecting each time.
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client(api_base: str) -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=api_base,
+            timeout=10,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=120),
+        )
+    return _client
+
+
+async def _close_client() -> None:
+    if _client is not None:
+        await _client.aclose()
+
+
+app.on_shutdown(_close_client)
+
+# returned by api_get when the server answers 304 Not Modified
+_NOT_MODIFIED: Any = object()
 
 
 class DashboardState:
     def __init__(self) -> None:
         self.latest_by_device: Dict[int, Dict[str, Any]] = {}
-        self.feed: Deque[Dict[str, Any]] = deque(maxlen=200)
+        # (ts html, message html) for the newest feed items, built once on arrival
+        self.feed_fmt: Deque[Tuple[str, str]] = deque(maxlen=12)
+        # status -> device count, kept by delta as results arrive
+        self.counts: CounterT[str] = Counter()
+        # (name, device id), kept sorted; table row order follows it
+        self.order: List[Tuple[str, int]] = []
+        # device id -> its table row; the static id/name/host/site fields are
+        # filled once when the device appears, results only patch the rest
+        self.base_row: Dict[int, Dict[str, Any]] = {}
 
 
 async def build_ui(api_base: str, ws_url: str) -> None:
@@ -27,11 +67,23 @@ async def build_ui(api_base: str, ws_url: str) -> None:
     </style>
     """)
 
+    client = _get_client(api_base)
+
+    # path -> last ETag seen, so unchanged polls come back as an empty 304
+    etags: Dict[str, str] = {}
+
+    def conditional(path: str) -> Dict[str, str]:
+        prev = etags.get(path)
+        return {"If-None-Match": prev} if prev else {}
+
     async def api_get(path: str):
-        async with httpx.AsyncClient(timeout=10) as client:
-            r = await client.get(f"{api_base}{path}")
-            r.raise_for_status()
-            return r.json()
+        r = await client.get(path, headers=conditional(path))
+        if r.status_code == 304:
+            return _NOT_MODIFIED
+        r.raise_for_status()
+        if "etag" in r.headers:
+            etags[path] = r.headers["etag"]
+        return orjson.loads(r.content)
 
     with ui.row().classes("w-full items-center justify-between"):
         ui.label("NetDash").classes("text-2xl font-bold")
@@ -42,15 +94,6 @@ async def build_ui(api_base: str, ws_url: str) -> None:
     down_lbl = ui.label("0").classes("text-3xl font-bold")
     degr_lbl = ui.label("0").classes("text-3xl font-bold")
 
-    def status_pill(status: str) -> str:
-        if status == "up":
-            return '<span class="pill bg-green-600 text-white">UP</span>'
-        if status == "down":
-            return '<span class="pill bg-red-600 text-white">DOWN</span>'
-        if status == "degraded":
-            return '<span class="pill bg-yellow-600 text-black">DEGRADED</span>'
-        return '<span class="pill bg-gray-600 text-white">UNKNOWN</span>'
-
     with ui.row().classes("w-full gap-4"):
         with ui.card().classes("card p-4 w-1/4"):
             ui.label("Devices").classes("opacity-70")
@@ -65,126 +108,226 @@ async def build_ui(api_base: str, ws_url: str) -> None:
             ui.label("Degraded").classes("opacity-70")
             degr_lbl
 
+    # rows carry only the status token; the browser renders the pill
+    status_slot = """
+    <q-td :props="props">
+      <q-badge rounded class="pill"
+               :color="({up: 'green-7', down: 'red-7', degraded: 'yellow-7'})[props.value] || 'grey-7'"
+               :text-color="props.value === 'degraded' ? 'black' : 'white'"
+               :label="(props.value || 'unknown').toUpperCase()" />
+    </q-td>
+    """
     columns = [
         {"name": "name", "label": "Device", "field": "name", "align": "left"},
         {"name": "host", "label": "Host", "field": "host", "align": "left"},
         {"name": "site", "label": "Site", "field": "site", "align": "left"},
-        {"name": "status", "label": "Status", "field": "status_html", "align": "left"},
+        {"name": "status", "label": "Status", "field": "status", "align": "left"},
         {"name": "latency", "label": "Latency (ms)", "field": "latency", "align": "right"},
         {"name": "last", "label": "Last Seen", "field": "last_seen", "align": "left"},
     ]
     table = ui.table(columns=columns, rows=[], row_key="id").classes("w-full").props("dense flat")
+    table.add_slot("body-cell-status", status_slot)
 
     feed_box = ui.column().classes("w-full gap-2")
     alerts_box = ui.column().classes("w-full gap-2")
     incidents_box = ui.column().classes("w-full gap-2")
     uptime_box = ui.column().classes("w-full gap-2")
 
-    def recompute_counts() -> None:
-        total = len(state.latest_by_device)
-        counts = defaultdict(int)
-        for v in state.latest_by_device.values():
-            counts[v.get("status", "unknown")] += 1
-        total_lbl.set_text(str(total))
+    def render_counts() -> None:
+        counts = state.counts
+        total_lbl.set_text(str(len(state.latest_by_device)))
         up_lbl.set_text(str(counts["up"]))
         down_lbl.set_text(str(counts["down"]))
         degr_lbl.set_text(str(counts["degraded"]))
 
+    def patch_row(row: Dict[str, Any], v: Dict[str, Any]) -> None:
+        row["status"] = v.get("status", "unknown")
+        row["latency"] = "" if v.get("latency_ms") is None else f"{v['latency_ms']:.0f}"
+        row["last_seen"] = v.get("ts", "")
+
     def render_table() -> None:
+        # full build on initial load; afterwards rows are patched or placed
         rows = []
-        for dev_id, v in sorted(state.latest_by_device.items(), key=lambda kv: kv[1].get("name", "")):
-            rows.append({
-                "id": dev_id,
-                "name": v.get("name", "?"),
-                "host": v.get("host", "?"),
-                "site": v.get("site", "default"),
-                "status_html": status_pill(v.get("status", "unknown")),
-                "latency": "" if v.get("latency_ms") is None else f"{v['latency_ms']:.0f}",
-                "last_seen": v.get("ts", ""),
-            })
+        for _, dev_id in state.order:
+            row = state.base_row[dev_id]
+            patch_row(row, state.latest_by_device[dev_id])
+            rows.append(row)
         table.rows = rows
         table.update()
 
+    def place_row(dev_id: int, v: Dict[str, Any]) -> None:
+        # new or renamed device: move its key in state.order and put the row
+        # at the matching index, without re-sorting everything
+        rows = table.rows
+        row = state.base_row.get(dev_id)
+        if row is not None:
+            i = bisect.bisect_left(state.order, (row["name"], dev_id))
+            del state.order[i]
+            del rows[i]
+            row.update(name=v["name"], host=v["host"], site=v["site"])
+        else:
+            row = state.base_row[dev_id] = {"id": dev_id, "name": v["name"], "host": v["host"], "site": v["site"]}
+        patch_row(row, v)
+        key = (v["name"], dev_id)
+        i = bisect.bisect_left(state.order, key)
+        state.order.insert(i, key)
+        rows.insert(i, row)
+
+    def make_slots(box: ui.column, n: int) -> List[tuple]:
+        # n hidden (card, top html, bottom html) slots, created once and
+        # refilled in place afterwards
+        slots = []
+        with box:
+            for _ in range(n):
+                with ui.card().classes("card p-3 w-full") as card:
+                    slot = (card, ui.html(""), ui.html(""))
+                card.set_visibility(False)
+                slots.append(slot)
+        return slots
+
+    def fill_slots(slots: List[tuple], items: List[Tuple[str, str]]) -> None:
+        for i, (card, top, bottom) in enumerate(slots):
+            if i < len(items):
+                t, b = items[i]
+                if top.content != t:
+                    top.set_content(t)
+                if bottom.content != b:
+                    bottom.set_content(b)
+                card.set_visibility(True)
+            else:
+                card.set_visibility(False)
+
+    # fixed ring of 12 feed cards, newest first; a new item recycles the
+    # bottom card and moves it to the top instead of rebuilding the list
+    feed_slots: Deque[tuple] = deque(make_slots(feed_box, 12))
+    # feed items received since the last render
+    feed_pending = 0
+
+    def push_feed(ts_html: str, msg_html: str) -> None:
+        card, ts_el, msg_el = slot = feed_slots.pop()
+        ts_el.set_content(ts_html)
+        msg_el.set_content(msg_html)
+        card.set_visibility(True)
+        card.move(feed_box, target_index=0)
+        feed_slots.appendleft(slot)
+
     def render_feed() -> None:
-        feed_box.clear()
-        for item in list(state.feed)[-12:][::-1]:
-            ts = item.get("ts", "")
-            msg = f"{item.get('device_name','?')} • {item.get('kind','?')} • {item.get('status','?')}"
-            with feed_box:
-                with ui.card().classes("card p-3 w-full"):
-                    ui.html(f"<div class='mono opacity-70'>{ts}</div>")
-                    ui.html(f"<div class='mono'>{msg}</div>")
-
-    async def refresh_alerts() -> None:
-        data = await api_get("/api/alerts?limit=50")
-        alerts_box.clear()
-        with alerts_box:
-            for a in data[:10]:
-                with ui.card().classes("card p-3 w-full"):
-                    ui.html(f"<div class='mono opacity-70'>{a['ts']}</div>")
-                    ui.html(f"<div class='mono'>{a['severity'].upper()} • {a['message']}</div>")
+        nonlocal feed_pending
+        n = min(feed_pending, len(state.feed_fmt))
+        feed_pending = 0
+        for i in range(len(state.feed_fmt) - n, len(state.feed_fmt)):
+            push_feed(*state.feed_fmt[i])
+
+    alert_slots = make_slots(alerts_box, 10)
+    with incidents_box:
+        no_incidents = ui.label("No active incidents").classes("opacity-70")
+    incident_slots = make_slots(incidents_box, 10)
+    with uptime_box:
+        no_uptime = ui.label("Not enough data yet for uptime summary").classes("opacity-70")
+    uptime_slots = make_slots(uptime_box, 10)
+
+    def render_alerts(data: list) -> None:
+        fill_slots(alert_slots, [
+            (f"<div class='mono opacity-70'>{a['ts']}</div>",
+             f"<div class='mono'>{a['severity'].upper()} • {a['message']}</div>")
+            for a in data[:10]
+        ])
+
+    def render_incidents(data: list) -> None:
+        no_incidents.set_visibility(not data)
+        fill_slots(incident_slots, [
+            (f"<div class='mono opacity-70'>Opened: {inc['opened_ts']}</div>",
+             f"<div class='mono'>Device ID {inc['device_id']} • Check ID {inc['check_id']} • STATE: OPEN</div>")
+            for inc in data[:10]
+        ])
+
+    def render_uptime(data: list) -> None:
+        # the server already dropped empty devices and kept the worst 10
+        no_uptime.set_visibility(not data)
+        fill_slots(uptime_slots, [
+            (f"<div class='mono'>{row['device_name']} • {row['site']}</div>",
+             f"<div class='mono opacity-70'>Uptime (24h): {row['uptime_pct']}% • samples: {row['total']}</div>")
+            for row in data[:10]
+        ])
 
     async def refresh_incidents() -> None:
         data = await api_get("/api/incidents?state=open&limit=50")
-        incidents_box.clear()
-        with incidents_box:
-            if not data:
-                ui.label("No active incidents").classes("opacity-70")
-                return
-            for inc in data[:10]:
-                with ui.card().classes("card p-3 w-full"):
-                    ui.html(f"<div class='mono opacity-70'>Opened: {inc['opened_ts']}</div>")
-                    ui.html(f"<div class='mono'>Device ID {inc['device_id']} • Check ID {inc['check_id']} • STATE: OPEN</div>")
-
-    async def refresh_uptime() -> None:
-        data = await api_get("/api/uptime/summary?minutes=1440")
-        uptime_box.clear()
-        with uptime_box:
-            shown = 0
-            for row in data:
-                if row["total"] == 0:
-                    continue
-                with ui.card().classes("card p-3 w-full"):
-                    ui.html(f"<div class='mono'>{row['device_name']} • {row['site']}</div>")
-                    ui.html(f"<div class='mono opacity-70'>Uptime (24h): {row['uptime_pct']}% • samples: {row['total']}</div>")
-                shown += 1
-                if shown >= 10:
-                    break
-            if shown == 0:
-                ui.label("Not enough data yet for uptime summary").classes("opacity-70")
-
-    devices = await api_get("/api/devices")
+        if data is not _NOT_MODIFIED:
+            render_incidents(data)
+
+    # the four startup fetches are independent; one round trip instead of four
+    devices, alerts, incidents, uptime = await asyncio.gather(
+        api_get("/api/devices"),
+        api_get("/api/alerts?limit=50"),
+        api_get("/api/incidents?state=open&limit=50"),
+        api_get("/api/uptime/summary?minutes=1440&limit=10&skip_empty=true"),
+    )
     for d in devices:
         state.latest_by_device[d["id"]] = {"name": d["name"], "host": d["host"], "site": d["site"], "status": "unknown"}
+        state.base_row[d["id"]] = {"id": d["id"], "name": d["name"], "host": d["host"], "site": d["site"]}
+    # every device starts unknown, so the snapshot primes the counts directly
+    state.counts = Counter(unknown=len(devices))
+    state.order = sorted((v["name"], dev_id) for dev_id, v in state.latest_by_device.items())
 
-    recompute_counts()
+    render_counts()
     render_table()
-    await refresh_alerts()
-    await refresh_incidents()
-    await refresh_uptime()
 
+    # the boxes are moved under their card headings so the content lands
+    # inside the card
     with ui.row().classes("w-full gap-4 mt-4"):
-        with ui.card().classes("card p-4 w-1/2"):
+        with ui.card().classes("card p-4 w-1/2") as card:
             ui.label("Live Feed").classes("font-semibold")
+            feed_box.move(card)
             render_feed()
-        with ui.card().classes("card p-4 w-1/2"):
+        with ui.card().classes("card p-4 w-1/2") as card:
             ui.label("Alerts").classes("font-semibold")
-            await refresh_alerts()
+            alerts_box.move(card)
+            render_alerts(alerts)
 
     with ui.row().classes("w-full gap-4 mt-4"):
-        with ui.card().classes("card p-4 w-1/2"):
+        with ui.card().classes("card p-4 w-1/2") as card:
             ui.label("Active Incidents").classes("font-semibold")
-            await refresh_incidents()
-        with ui.card().classes("card p-4 w-1/2"):
+            incidents_box.move(card)
+            render_incidents(incidents)
+        with ui.card().classes("card p-4 w-1/2") as card:
             ui.label("Worst Uptime (24h)").classes("font-semibold")
-            await refresh_uptime()
-
-    async def on_ws_message(msg: dict) -> None:
+            uptime_box.move(card)
+            render_uptime(uptime)
+
+    # WS messages only mark sections dirty; one flush 150ms later renders each
+    # dirty section once, so a burst of N results costs one render, not N
+    _dirty = {"table": False, "feed": False, "counts": False}
+    _flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def _flush() -> None:
+        nonlocal _flush_handle
+        _flush_handle = None
+        if _dirty["counts"]:
+            render_counts()
+        if _dirty["table"]:
+            table.update()
+        if _dirty["feed"]:
+            render_feed()
+        for k in _dirty:
+            _dirty[k] = False
+
+    def _mark(*sections: str) -> None:
+        nonlocal _flush_handle
+        for k in sections:
+            _dirty[k] = True
+        if _flush_handle is None:
+            _flush_handle = asyncio.get_running_loop().call_later(0.15, _flush)
+
+    def _process_one(msg: dict) -> bool:
+        # apply one WS message to state; True if open incidents need a refresh
+        nonlocal feed_pending
         t = msg.get("type")
 
         if t == "result":
             dev_id = msg["device_id"]
-            state.latest_by_device[dev_id] = {
+            prev = state.latest_by_device.get(dev_id)
+            old = prev["status"] if prev is not None else None
+            v = state.latest_by_device[dev_id] = {
                 "name": msg["device_name"],
                 "host": msg["host"],
                 "site": msg.get("site", "default"),
@@ -192,27 +335,94 @@ async def build_ui(api_base: str, ws_url: str) -> None:
                 "latency_ms": msg.get("latency_ms"),
                 "ts": msg["ts"],
             }
-            state.feed.append(msg)
-            recompute_counts()
-            render_table()
-            render_feed()
+            state.feed_fmt.append((
+                f"<div class='mono opacity-70'>{msg['ts']}</div>",
+                f"<div class='mono'>{msg['device_name']} • {msg.get('kind', '?')} • {msg['status']}</div>",
+            ))
+            feed_pending += 1
+
+            new = v["status"]
+            if old != new:
+                if old is not None:
+                    state.counts[old] -= 1
+                state.counts[new] += 1
+                _mark("counts")
+
+            row = state.base_row.get(dev_id)
+            if row is None or row["name"] != v["name"]:
+                place_row(dev_id, v)
+            else:
+                patch_row(row, v)
+            _mark("table", "feed")
 
         elif t in ("incident_opened", "incident_closed"):
+            return True
+        return False
+
+    async def on_ws_batch(batch: list) -> None:
+        incidents_changed = False
+        for raw in batch:
+            try:
+                msg = orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                continue
+            incidents_changed |= _process_one(msg)
+        if incidents_changed:
             await refresh_incidents()
 
+    # the browser buffers raw WS frames and hands them over every 100ms in
+    # one event; they are parsed here, once, instead of JSON.parse + a
+    # CustomEvent re-serialization per message
     ui.run_javascript(f"""
+    window.__netdash_buf = [];
     window.__netdash_ws = new WebSocket("{ws_url}");
-    window.__netdash_ws.onmessage = (ev) => {{
-        try {{
-            const data = JSON.parse(ev.data);
-            window.dispatchEvent(new CustomEvent("netdash_ws", {{ detail: data }}));
-        }} catch (e) {{}}
-    }};
+    window.__netdash_ws.onmessage = (ev) => {{ window.__netdash_buf.push(ev.data); }};
+    setInterval(() => {{
+        if (window.__netdash_buf.length) {{
+            const buf = window.__netdash_buf;
+            window.__netdash_buf = [];
+            emitEvent("netdash_ws_batch", buf);
+        }}
+    }}, 100);
     """)
 
-    ui.on("netdash_ws", lambda e: asyncio.create_task(on_ws_message(e.args["detail"])))
-
-    ui.timer(10.0, lambda: asyncio.create_task(refresh_alerts()))
-    ui.timer(10.0, lambda: asyncio.create_task(refresh_incidents()))
-    ui.timer(30.0, lambda: asyncio.create_task(refresh_uptime()))
+    ui.on("netdash_ws_batch", lambda e: asyncio.create_task(on_ws_batch(e.args)))
+
+    tick = 0
+
+    async def _refresh_all() -> None:
+        # one /api/dashboard round trip per tick; every third tick (30s) it
+        # also carries the worst 10 uptime rows, trimmed server-side
+        nonlocal tick
+        tick += 1
+        with_uptime = tick % 3 == 0
+        query = "uptime=true&uptime_limit=10&uptime_skip_empty=true" if with_uptime else "uptime=false"
+        data = await api_get(f"/api/dashboard?{query}")
+        if data is not _NOT_MODIFIED:
+            render_alerts(data["alerts"])
+            render_incidents(data["incidents"])
+            if with_uptime:
+                render_uptime(data["uptime"])
+
+    page_client = ui.context.client
+
+    async def poll_loop() -> None:
+        # one long-lived task per page instead of a task per timer tick, so
+        # refreshes never overlap and the pooled connection stays warm. It
+        # runs until the client is deleted, not merely disconnected: NiceGUI
+        # reconnects the same client after a brief socket drop.
+        while True:
+            await asyncio.sleep(10.0)
+            if page_client.id not in Client.instances:
+                return
+            try:
+                await _refresh_all()
+            except httpx.HTTPError as e:
+                log.warning("dashboard refresh failed: %s", e)  # next tick retries
+            except Exception:
+                log.exception("dashboard refresh failed")
+
+    # background_tasks holds a strong reference, so the page-lifetime task
+    # can't be garbage-collected mid-run
+    background_tasks.create(poll_loop(), name="netdash-poll")
 